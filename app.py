@@ -1,66 +1,337 @@
 import json
+import logging
 import openai
 import requests
 import streamlit as st
 import pandas as pd
 import os
-import time
-import random
+import re
+import unicodedata
 
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode
 from dotenv import load_dotenv
-from requests.exceptions import RequestException, Timeout, ConnectionError
+from gbif_chat.assets import PAGE_ICON
+from gbif_chat.prompts import SYSTEM_PROMPT
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
 
 # Set up API client
 
-load_dotenv()
 
-client = openai.OpenAI(api_key=os.getenv("GBIF_CHAT_OPENAI_API_KEY"))
+@st.cache_resource
+def load_environment():
+    """
+    Read the .env file once per process rather than on every Streamlit rerun.
+    """
+    load_dotenv()
+
+
+load_environment()
+
 GBIF_API_BASE_URL = "https://api.gbif.org/v1/occurrence/search"
+# Model used to parse queries, set GBIF_CHAT_MODEL to use a faster or cheaper one
+QUERY_MODEL = os.getenv("GBIF_CHAT_MODEL", "o4-mini-2025-04-16")
+# Records fetched from GBIF and sent to the browser per results page, by default
+# and as offered to the user. The occurrence search API allows at most 300.
+PAGE_SIZE = 50
+PAGE_SIZE_OPTIONS = (25, 50, 100, 200, 300)
+# Exports fetch the largest page GBIF allows, up to a fixed number of records
+EXPORT_PAGE_SIZE = 300
+EXPORT_MAX_RECORDS = 3000
+# Columns shown, in order, when the condensed results table is selected
+CONDENSED_COLUMNS = (
+    "link",
+    "catalogNumber",
+    "scientificName",
+    "eventDate",
+    "recordedBy",
+    "locality",
+    "media_url",
+)
+# Occurrence record fields needed to build the condensed columns
+CONDENSED_SOURCE_FIELDS = (
+    "key",
+    "catalogNumber",
+    "scientificName",
+    "eventDate",
+    "recordedBy",
+    "locality",
+)
+# Column settings for the results table, shared by every render
+RESULTS_COLUMN_CONFIG = {
+    "link": st.column_config.LinkColumn("link", display_text="View record"),
+    "media_url": st.column_config.LinkColumn("image", display_text="View image"),
+}
+# Used instead when recordedBy holds lists of several collectors
+COLLECTORS_COLUMN_CONFIG = {
+    **RESULTS_COLUMN_CONFIG,
+    "recordedBy": st.column_config.ListColumn(),
+}
+
+
+@st.cache_resource
+def get_client() -> openai.OpenAI:
+    """
+    OpenAI client shared across reruns so its connection pool stays warm.
+    """
+    return openai.OpenAI(api_key=os.getenv("GBIF_CHAT_OPENAI_API_KEY"))
+
 
 # Setup settings for app
 st.set_page_config(
     page_title="GBIF Chat Search",
-    page_icon="data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48ZyBmaWxsPSIjMzE4NjJjIiBmaWxsLXJ1bGU9ImV2ZW5vZGQiIGNsaXAtcnVsZT0iZXZlbm9kZCI+PHBhdGggZD0iTTIyLjU4NiAxMC4xNzNhMi4yNSAyLjI1IDAgMCAxLTIuMTc3LS41ODJsLS41NDEtLjU0MWE0Ljc1IDQuNzUgMCAwIDEtNS4xOS03LjM3MWE3LjcgNy43IDAgMCAwLTEuNjA0LS4zNzZBMTEgMTEgMCAwIDAgMTIgMS4yNUM2LjA2MyAxLjI1IDEuMjUgNi4wNjMgMS4yNSAxMmMwIDEuODU2LjQ3MSAzLjYwNSAxLjMgNS4xM2wtLjc4NyA0LjIzM2EuNzUuNzUgMCAwIDAgLjg3NC44NzRsNC4yMzMtLjc4OEExMC43IDEwLjcgMCAwIDAgMTIgMjIuNzVjNS45MzcgMCAxMC43NS00LjgxMyAxMC43NS0xMC43NXEwLS41NDMtLjA1My0xLjA3NHMtLjA0NS0uMzI1LS4xMTEtLjc1M00xOS45NyA1Ljk3YS43NS43NSAwIDAgMSAxLjA2IDBsMS41IDEuNWEuNzUuNzUgMCAwIDEtMS4wNiAxLjA2bC0xLjUtMS41YS43NS43NSAwIDAgMSAwLTEuMDYiLz48cGF0aCBkPSJNMTguNSAyLjc1YTEuNzUgMS43NSAwIDEgMCAwIDMuNWExLjc1IDEuNzUgMCAwIDAgMC0zLjVNMTUuMjUgNC41YTMuMjUgMy4yNSAwIDEgMSA2LjUgMGEzLjI1IDMuMjUgMCAwIDEtNi41IDAiLz48L2c+PC9zdmc+",
+    page_icon=PAGE_ICON,
     layout="wide",
 )
 
 
-def extract_query_fields(user_input):
-    system_prompt = """
+# Fields the query parser may return. Strict structured outputs require every
+# property to be listed as required, so missing values are returned as null.
+QUERY_FIELDS = (
+    "scientificName",
+    "locality",
+    "continent",
+    "country",
+    "stateProvince",
+    "recordedBy",
+    "eventDate",
+    "recordNumber",
+    "mediaType",
+    "institution",
+    "collection",
+)
+QUERY_FIELDS_SCHEMA = {
+    "type": "object",
+    "properties": {field: {"type": ["string", "null"]} for field in QUERY_FIELDS},
+    "required": list(QUERY_FIELDS),
+    "additionalProperties": False,
+}
+
+# Completed "institution" or "collection" string values in partial model output
+NAME_FIELD_PATTERN = re.compile(r'"(institution|collection)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def model_options(model: str) -> dict:
+    """
+    Request options for the query parser that depend on the model family.
+    """
+    if re.match(r"o\d|gpt-5", model):
+        # Field extraction needs little deliberation, and reasoning tokens are
+        # generated before any output, so they dominate the call's latency.
+        # The token limit is left unset as it would also count reasoning tokens.
+        return {"reasoning_effort": "low"}
+    # The output is a small flat object, so cap runaway generations. Parses are
+    # cached per query, so keep them as repeatable as the model allows.
+    return {"max_completion_tokens": 300, "temperature": 0}
 
-    You are a chatbot helping users convert natural langauge prompts into Global Biodiversity Information FacilityAPI fields.
 
-    Extract the taxonomy (scientific_name), location (locality), collection, institution, continent (continent), country (country), state/province (stateProvince), collector (recordedBy), collection date (eventDate), collector number (recordNumber), and mediaType from the user query:
+def normalize_query(user_input: str) -> str:
+    """
+    Collapse case, whitespace and trailing punctuation so trivially different
+    queries share a cache entry.
+    """
+    return " ".join(user_input.lower().split()).rstrip(".?! ")
 
-    Return the result as a JSON dictionary using only valid gbif api parameters as keys if mentioned. For example, these are some examples of valid keys:
-        'scientificName', 'locality', 'continent', 'country', 'stateProvince', 'recordedBy', 'eventDate', "recordNumber", "mediaType"
 
-    Additional instructions:
-        - Output should be valid JSON only.
-        - Use 'location' only for geographic localities, lakes, cities, landmarks, etc. Do not put the collection or institution value in this field.
-        - Only use recordedBy for human names.
-        - The name of the collection, if present, should be assigned to the "collection" key in the JSON.
-        - The name of the institution, if present, should be assigned to the "institution" key in the JSON.
-        - If there is a range, separate the values by a ,
-        - If there is a country specified, use the two letter code for that country in capital letters as the value.
-        - If a continent is specified, use the following format "North America", "Europe". Do not capitlize it with an underscore.
-        - If the user enters the common name for a scientific name, such as "Sparrow", use the scientific name that best fits that common name.
-        - If there is no value, do NOT put the value as null. Just leave the parameter out.
+def extract_query_fields(user_input):
     """
-    response = client.chat.completions.create(
-        model="o4-mini-2025-04-16",
+    Parse a natural language query into GBIF fields, reusing cached results for
+    queries that only differ by case or whitespace.
+    """
+    return _extract_query_fields(normalize_query(user_input), user_input)
+
+
+@st.cache_data(ttl=86400, max_entries=1024, show_spinner=False)
+def _extract_query_fields(query_key: str, _user_input: str) -> dict:
+    # Only query_key is hashed by the cache, the raw input is what the model sees
+    stream = get_client().chat.completions.create(
+        model=QUERY_MODEL,
         messages=[
-            {"role": "developer", "content": system_prompt},
-            {"role": "user", "content": user_input},
+            {"role": "developer", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": _user_input},
         ],
-        response_format={"type": "json_object"},
+        response_format={
+            "type": "json_schema",
+            "json_schema": {
+                "name": "gbif_fields",
+                "schema": QUERY_FIELDS_SCHEMA,
+                "strict": True,
+            },
+        },
+        stream=True,
+        **model_options(QUERY_MODEL),
     )
-    extracted = response.choices[0].message.content
-    return json.loads(extracted)
+
+    # Show the JSON as it is generated so the search does not look stalled. The
+    # preview is created inside this function so a cache hit can replay it.
+    preview = st.empty()
+    extracted = ""
+    prefetched = set()
+    # Clear the preview even if the stream or parsing fails partway, so a half
+    # written object is not left above the error message
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                extracted += chunk.choices[0].delta.content
+                preview.code(extracted, language="json")
+                # Start key lookups as soon as their names are complete, overlapping
+                # them with the rest of the generation
+                for match in NAME_FIELD_PATTERN.finditer(extracted):
+                    if match.group(1) not in prefetched:
+                        prefetched.add(match.group(1))
+                        prefetch_guid(match.group(1), json.loads(f'"{match.group(2)}"'))
+                # Stop reading as soon as the object is complete rather than waiting
+                # for the closing chunk. A brace inside a string value won't parse.
+                if extracted.rstrip().endswith("}"):
+                    try:
+                        fields = json.loads(extracted)
+                    except json.JSONDecodeError:
+                        continue
+                    stream.close()
+                    break
+        else:
+            fields = json.loads(extracted)
+    finally:
+        preview.empty()
+    # Keep to the known fields even if a model doesn't honour the strict schema,
+    # so nothing else can end up as a GBIF search parameter
+    return {
+        field: value
+        for field, value in fields.items()
+        if field in QUERY_FIELDS and value is not None
+    }
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize an institution or collection name so that "ROM", "rom" and " Rom"
+    share a single cache entry.
+    """
+    return unicodedata.normalize("NFKC", name).strip().casefold()
+
+
+@st.cache_data(ttl=86400, max_entries=1024, show_spinner=False)
+def _search_grscicoll_key(entity: str, name: str) -> str:
+    """
+    Return the key of the first GRSciColl institution or collection matching name.
+    Request errors are raised rather than returned so that failures are not cached.
+    """
+    search_url = (
+        f"https://api.gbif.org/v1/grscicoll/{entity}/search?{urlencode({'q': name})}"
+    )
+    response = make_request_with_retry(search_url)
+    data = response.json()
+
+    if data.get("results") and len(data["results"]) > 0:
+        return data["results"][0]["key"]
+    return None
+
+
+@st.cache_resource
+def load_grscicoll_aliases() -> dict:
+    """
+    Institution and collection keys known ahead of time, read from the JSON file
+    named by GBIF_CHAT_ALIASES_FILE, so that common names skip the GRSciColl
+    search. The file maps "institution" and "collection" to {name: key} objects.
+    Returns a dict keyed by (entity, normalized name). An unreadable or malformed
+    file is logged and ignored, so lookups fall back to the GRSciColl search.
+    """
+    path = os.getenv("GBIF_CHAT_ALIASES_FILE")
+    if not path:
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            aliases = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring aliases file %s: %s", path, e)
+        return {}
+    if not (
+        isinstance(aliases, dict)
+        and all(
+            entity in ("institution", "collection")
+            and isinstance(names, dict)
+            and all(
+                isinstance(name, str) and isinstance(key, str)
+                for name, key in names.items()
+            )
+            for entity, names in aliases.items()
+        )
+    ):
+        logger.warning(
+            "Ignoring aliases file %s: expected "
+            '{"institution"|"collection": {name: key}} objects',
+            path,
+        )
+        return {}
+    return {
+        (entity, normalize_name(name)): key
+        for entity, names in aliases.items()
+        for name, key in names.items()
+    }
 
 
-def get_institution_guid(institution_name: str) -> str:
+def get_pending_lookups() -> dict:
+    """
+    GRSciColl lookups this session started ahead of time, keyed by (entity,
+    normalized name). They are kept per session so that a search which dies
+    partway can't leave a stale or failed lookup behind for other users.
+    """
+    return st.session_state.setdefault("pending_lookups", {})
+
+
+def take_prefetched_guid(entity: str, name: str):
+    """
+    Remove and return the prefetched lookup for name, or None if there is none.
+    """
+    if not name or not name.strip():
+        return None
+    return get_pending_lookups().pop((entity, normalize_name(name)), None)
+
+
+def discard_pending_lookups():
+    """Cancel this session's prefetched lookups that were never used"""
+    for future in st.session_state.pop("pending_lookups", {}).values():
+        future.cancel()
+
+
+def prefetch_guid(entity: str, name: str):
+    """
+    Start looking up the key for an institution or collection name in the
+    background, so that a later lookup_guid call can reuse the request.
+    """
+    if not name or not name.strip():
+        return
+    lookup = (entity, normalize_name(name))
+    pending = get_pending_lookups()
+    if lookup not in pending and lookup not in load_grscicoll_aliases():
+        pending[lookup] = get_executor().submit(_search_grscicoll_key, *lookup)
+
+
+def lookup_guid(entity: str, name: str, prefetched=None) -> str:
+    """
+    Return the GRSciColl key for name, from the configured aliases if listed there,
+    else from the prefetched request if one is already running and otherwise by
+    looking it up directly.
+    """
+    lookup = (entity, normalize_name(name))
+    alias_key = load_grscicoll_aliases().get(lookup)
+    if alias_key is not None:
+        return alias_key
+    # A prefetch still queued behind other work is cancelled rather than waited
+    # on, and one that failed is retried directly, as failures are not cached
+    if prefetched is not None and not prefetched.cancel():
+        try:
+            return prefetched.result()
+        except (RequestException, ValueError):
+            pass
+    return _search_grscicoll_key(*lookup)
+
+
+def get_institution_guid(institution_name: str, prefetched=None) -> str:
     """
     Convert institution name to GBIF institution key (GUID).
     Returns the first match or None if no matches found.
@@ -68,21 +339,13 @@ def get_institution_guid(institution_name: str) -> str:
     if not institution_name or not institution_name.strip():
         return None
 
-    search_url = (
-        f"https://api.gbif.org/v1/grscicoll/institution/search?q={institution_name}"
-    )
     try:
-        response = make_request_with_retry(search_url, max_retries=2, base_delay=0.5)
-        data = response.json()
-
-        if data.get("results") and len(data["results"]) > 0:
-            return data["results"][0]["key"]
-        return None
+        return lookup_guid("institution", institution_name, prefetched)
     except (RequestException, json.JSONDecodeError):
         return None
 
 
-def get_collection_guid(collection_name: str) -> str:
+def get_collection_guid(collection_name: str, prefetched=None) -> str:
     """
     Convert collection name to GBIF collection key (GUID).
     Returns the first match or None if no matches found.
@@ -90,106 +353,249 @@ def get_collection_guid(collection_name: str) -> str:
     if not collection_name or not collection_name.strip():
         return None
 
-    search_url = (
-        f"https://api.gbif.org/v1/grscicoll/collection/search?q={collection_name}"
-    )
     try:
-        response = make_request_with_retry(search_url, max_retries=2, base_delay=0.5)
-        data = response.json()
-
-        if data.get("results") and len(data["results"]) > 0:
-            return data["results"][0]["key"]
-        return None
+        return lookup_guid("collection", collection_name, prefetched)
     except (RequestException, json.JSONDecodeError):
         return None
 
 
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Thread pool shared across reruns, used to overlap independent GBIF requests.
+    """
+    return ThreadPoolExecutor(max_workers=4)
+
+
+@st.cache_resource
+def get_prefetch_executor() -> ThreadPoolExecutor:
+    """
+    Thread pool for speculative next-page fetches, kept apart from get_executor
+    so that a slow prefetch can't hold up the key lookups of other searches.
+    """
+    return ThreadPoolExecutor(max_workers=2)
+
+
+@st.cache_resource
+def get_export_executor() -> ThreadPoolExecutor:
+    """
+    Thread pool for multi-page exports, kept apart from get_executor so that a
+    long export can't hold up the key lookups of other searches.
+    """
+    return ThreadPoolExecutor(max_workers=4)
+
+
+def resolve_guids(fields: dict) -> dict:
+    """
+    Resolve the institution and collection names in fields to GBIF keys, running
+    the lookups concurrently when both are present. Returns institutionKey and/or
+    collectionKey for the names that matched.
+    """
+    institution_name = fields.get("institution")
+    collection_name = fields.get("collection")
+    # Session state is only available on the script thread, so the prefetched
+    # lookups are taken here and handed to the pool
+    institution_prefetch = take_prefetched_guid("institution", institution_name)
+    collection_prefetch = take_prefetched_guid("collection", collection_name)
+    if institution_name and collection_name:
+        # Run the institution lookup in the pool while this thread does the other
+        institution_future = get_executor().submit(
+            get_institution_guid, institution_name, institution_prefetch
+        )
+        collection_guid = get_collection_guid(collection_name, collection_prefetch)
+        institution_guid = institution_future.result()
+    else:
+        # At most one lookup is needed, so there is nothing to overlap
+        institution_guid = get_institution_guid(institution_name, institution_prefetch)
+        collection_guid = get_collection_guid(collection_name, collection_prefetch)
+
+    guids = {}
+    if institution_guid:
+        guids["institutionKey"] = institution_guid
+    if collection_guid:
+        guids["collectionKey"] = collection_guid
+    return guids
+
+
 # Generate URL
 def generate_gbif_search_url(
     fields: dict,
+    guids: dict,
     institution_key: str,
     institution_code: str,
     collection_code: str,
     offset: int = 0,
+    limit: int = PAGE_SIZE,
 ) -> str:
-    processed_fields = fields.copy()
-
-    # Convert institution name to GUID if present
-    if "institution" in processed_fields:
-        institution_guid = get_institution_guid(processed_fields["institution"])
-        if institution_guid:
-            processed_fields["institutionKey"] = institution_guid
-        # Remove the original text field
-        del processed_fields["institution"]
-
-    # Convert collection name to GUID if present
-    if "collection" in processed_fields:
-        collection_guid = get_collection_guid(processed_fields["collection"])
-        if collection_guid:
-            processed_fields["collectionKey"] = collection_guid
-        # Remove the original text field
-        del processed_fields["collection"]
-
-    params = []
+    # Replace the institution and collection names with their GUIDs, resolved
+    # once per search by resolve_guids
+    processed_fields = {
+        key: value
+        for key, value in fields.items()
+        if key not in ("institution", "collection")
+    }
+    processed_fields.update(guids)
+
+    # Empty values are dropped rather than sent as filters like "locality="
+    query = [
+        (key, value)
+        for key, value in processed_fields.items()
+        if value not in ("", None)
+    ]
+    query += [
+        ("limit", limit),
+        ("offset", offset),
+        ("basisOfRecord", "PRESERVED_SPECIMEN"),
+    ]
     if institution_key:
-        params.append(f"institutionKey={institution_key}")
+        query.append(("institutionKey", institution_key))
     if institution_code and institution_code.strip():
-        params.append(f"institutionCode={institution_code}")
+        query.append(("institutionCode", institution_code.strip()))
     if collection_code and collection_code.strip():
-        params.append(f"collectionCode={collection_code}")
-    base_url = f"{GBIF_API_BASE_URL}?{urlencode(processed_fields)}&limit=300&offset={offset}&basisOfRecord=PRESERVED_SPECIMEN"
-    if params:
-        base_url += "&" + "&".join(params)
-    return base_url
+        query.append(("collectionCode", collection_code.strip()))
+    return f"{GBIF_API_BASE_URL}?{urlencode(query, doseq=True)}"
 
 
-def make_request_with_retry(url, max_retries=3, base_delay=1, timeout=30):
+class CappedRetry(Retry):
+    """
+    Retry policy that caps how long a Retry-After header can make a request
+    wait, since the wait blocks the script thread or a shared pool worker.
     """
-    Make HTTP request with exponential backoff retry logic.
+
+    MAX_RETRY_AFTER = 10
+
+    def parse_retry_after(self, retry_after: str) -> float:
+        return min(super().parse_retry_after(retry_after), self.MAX_RETRY_AFTER)
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """
+    HTTP session shared across reruns so connections to the GBIF API are kept
+    alive and reused instead of repeating the TCP and TLS handshake per request.
+    """
+    session = requests.Session()
+    # Ask for JSON explicitly, so error pages come back as JSON where GBIF can,
+    # and identify the app so GBIF can attribute the traffic
+    session.headers.update(
+        {
+            "Accept": "application/json",
+            "User-Agent": "gbif-chat-search/0.1.0 (+https://github.com/mark-pitblado/gbif-chat-search)",
+        }
+    )
+    # Retry connection errors, timeouts, rate limiting and server errors up to
+    # three times, waiting 0s, 1s then 2s plus up to 1s of jitter so retries
+    # from concurrent sessions don't line up. A Retry-After from GBIF replaces
+    # that wait, capped by CappedRetry. Other client errors are not retried. The
+    # last response is returned rather than raised, so make_request_with_retry
+    # reports its status.
+    retry = CappedRetry(
+        total=3,
+        backoff_factor=0.5,
+        backoff_jitter=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    # Sized for the concurrent key lookups plus the occurrence search, all of
+    # which go to api.gbif.org
+    session.mount(
+        "https://",
+        HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry),
+    )
+    return session
+
+
+def warm_up_gbif_connection():
+    """
+    Open a pooled connection to api.gbif.org in the background, so the TLS
+    handshake overlaps query parsing instead of delaying the first GBIF request.
+    Failures are ignored; the real requests retry on their own.
+    """
+    get_executor().submit(get_session().head, "https://api.gbif.org/v1/", timeout=5)
+
+
+def make_request_with_retry(url, timeout=(3.05, 30)):
+    """
+    Make an HTTP GET request through the shared session, whose adapter retries
+    connection errors, timeouts, rate limiting and server errors with
+    exponential backoff.
 
     Args:
         url: URL to request
-        max_retries: Maximum number of retry attempts
-        base_delay: Base delay in seconds for exponential backoff
-        timeout: Request timeout in seconds
+        timeout: Request timeout in seconds, or a (connect, read) tuple
 
     Returns:
         requests.Response object
 
     Raises:
-        RequestException: If all retry attempts fail
+        RequestException: If the request fails or still has an error status
+            after the retries
     """
-    for attempt in range(max_retries + 1):
-        try:
-            response = requests.get(url, timeout=timeout)
-            response.raise_for_status()
-            return response
-        except (ConnectionError, Timeout) as e:
-            if attempt == max_retries:
-                raise RequestException(
-                    f"Failed after {max_retries + 1} attempts: {str(e)}"
-                )
+    response = get_session().get(url, timeout=timeout)
+    response.raise_for_status()
+    return response
 
-            # Calculate delay with exponential backoff + jitter
-            delay = base_delay * (2**attempt) + random.uniform(0, 1)
-            time.sleep(delay)
-        except requests.HTTPError as e:
-            # Don't retry on client errors (4xx), but retry on server errors (5xx)
-            if 400 <= e.response.status_code < 500:
-                raise e
-            elif attempt == max_retries:
-                raise RequestException(
-                    f"Failed after {max_retries + 1} attempts: {str(e)}"
-                )
 
-            delay = base_delay * (2**attempt) + random.uniform(0, 1)
-            time.sleep(delay)
-        except RequestException as e:
-            if attempt == max_retries:
-                raise e
+def get_occurrence_search(search_url: str) -> dict:
+    """
+    Request a GBIF occurrence search and return the decoded response.
+    """
+    response = make_request_with_retry(search_url)
+    # A proxy or maintenance page can answer 200 with HTML; don't try to parse it
+    content_type = response.headers.get("Content-Type", "")
+    if not content_type.startswith("application/json"):
+        raise ValueError(f"unexpected content type {content_type!r}")
+    return response.json()
 
-            delay = base_delay * (2**attempt) + random.uniform(0, 1)
-            time.sleep(delay)
+
+@st.cache_data(ttl=600, max_entries=128, show_spinner=False)
+def fetch_occurrences(search_url: str) -> list[dict]:
+    """
+    Fetch the occurrence records for a fully resolved GBIF search URL. Results are
+    cached on the URL, which encodes every filter and the page offset.
+    """
+    return get_occurrence_search(search_url)["results"]
+
+
+@st.cache_data(ttl=600, max_entries=128, show_spinner=False)
+def fetch_occurrence_count(search_url: str) -> int:
+    """
+    Fetch the total number of records matching a GBIF search URL.
+    """
+    return get_occurrence_search(search_url)["count"]
+
+
+def fetch_all_occurrences(search_params: dict) -> tuple[list[dict], int]:
+    """
+    Fetch every record of a search, up to EXPORT_MAX_RECORDS, requesting the pages
+    concurrently since each offset is an independent request. Returns the records
+    and the total number of matches.
+    """
+    count = fetch_occurrence_count(search_page_url(search_params, 0, page_size=0))
+    pages = range(-(-min(count, EXPORT_MAX_RECORDS) // EXPORT_PAGE_SIZE))
+    page_urls = [
+        search_page_url(search_params, page, page_size=EXPORT_PAGE_SIZE)
+        for page in pages
+    ]
+    results = get_export_executor().map(fetch_occurrences, page_urls)
+    return [record for page in results for record in page], count
+
+
+def prefetch_occurrences(search_url: str):
+    """
+    Start fetching a page of results in the background, so it is ready by the
+    time the user asks for it. Only the two most recent prefetches are kept.
+    """
+    prefetched = st.session_state.setdefault("prefetch", {})
+    if search_url in prefetched:
+        return
+    while len(prefetched) >= 2:
+        prefetched.pop(next(iter(prefetched))).cancel()
+    prefetched[search_url] = get_prefetch_executor().submit(
+        fetch_occurrences, search_url
+    )
 
 
 # Generate table
@@ -198,76 +604,140 @@ def generate_table(search_url: str, condensed_table: bool):
     Takes the json response of a GBIF api call and creates a streamlit table.
     """
     try:
-        response = make_request_with_retry(search_url, max_retries=3, base_delay=1)
-        if len(response.json()["results"]) == 0:
+        # Wait on a prefetched request for this page only if it is already
+        # running; one still queued is cancelled and the page fetched directly
+        future = st.session_state.get("prefetch", {}).pop(search_url, None)
+        if future is not None and not future.cancel():
+            results = future.result()
+        else:
+            results = fetch_occurrences(search_url)
+        if len(results) == 0:
             st.error("No values were found for your query. Please try again.")
             return None
     except RequestException as e:
         st.error(f"Failed to fetch data from GBIF API: {str(e)}")
         return None
-    except (KeyError, json.JSONDecodeError) as e:
+    except (KeyError, ValueError) as e:
+        # json.JSONDecodeError is a ValueError
         st.error(f"Received invalid response {str(e)} from GBIF API. Please try again.")
         return None
 
-    df = pd.DataFrame(response.json()["results"])
-    df["key"] = "https://gbif.org/occurrence/" + df["key"].astype("str")
-    df = df.rename({"key": "link"}, axis=1)
-
-    # Handle images
-    if "media" in df.columns:
-
-        def extract_media_info(media_list):
-            if not media_list or not isinstance(media_list, list):
-                return "", ""
-            identifiers = []
-            for media_item in media_list:
-                if isinstance(media_item, dict) and "identifier" in media_item:
-                    identifiers.append(media_item["identifier"])
-
-            if not identifiers:
-                return "", ""
-
-            # Return first URL and count
-            first_url = identifiers[0]
-            count = len(identifiers)
-            return (
-                first_url,
-                f"View image{' (' + str(count) + ')' if count > 1 else ''}",
-            )
+    return build_dataframe(results, condensed_table)
 
-        media_info = df["media"].apply(extract_media_info)
-        df["media_url"] = [info[0] for info in media_info]
-    col_order = [
-        "link",
-        "catalogNumber",
-        "scientificName",
-        "eventDate",
-        "recordedBy",
-        "locality",
-        "media_url",
-    ]
-    existing_cols = [col for col in col_order if col in df.columns]
+
+def first_media_identifier(record: dict) -> str:
+    """Return the identifier of the first media item of an occurrence record"""
+    media_list = record.get("media")
+    if not isinstance(media_list, list):
+        return ""
+    for item in media_list:
+        if isinstance(item, dict) and "identifier" in item:
+            return item["identifier"]
+    return ""
+
+
+def build_dataframe(results: list[dict], condensed_table: bool) -> pd.DataFrame:
+    """
+    Convert GBIF occurrence records into the DataFrame shown in the results table.
+    """
     if condensed_table:
-        return df[existing_cols]
+        # Only pull the fields the condensed table is built from, rather than
+        # building and then discarding dozens of nested columns. Passing columns
+        # lets pandas do the projection while it reads the records.
+        df = pd.DataFrame(results, columns=CONDENSED_SOURCE_FIELDS)
+    else:
+        df = pd.DataFrame(results)
+    # Rename in place rather than copying the frame, then build the links in
+    # Arrow string storage rather than as Python str objects
+    df.rename(columns={"key": "link"}, inplace=True)
+    df["link"] = "https://gbif.org/occurrence/" + df["link"].astype("string[pyarrow]")
+
+    # Handle images straight from the records, so the condensed table never
+    # holds the nested media lists at all
+    df["media_url"] = [first_media_identifier(record) for record in results]
+    existing_cols = [col for col in CONDENSED_COLUMNS if col in df.columns]
+    if condensed_table:
+        # The condensed columns are all text, and Arrow-backed strings are handed
+        # to st.dataframe without another conversion from Python objects
+        return df[existing_cols].astype("string[pyarrow]")
     return df
 
 
+def has_search_filters(search_params: dict) -> bool:
+    """
+    Whether a parsed search narrows the results at all. Without any filter the
+    occurrence search would just return arbitrary preserved specimens.
+    """
+    if not search_params or search_params["fields"] is None:
+        return False
+    return bool(
+        search_params["fields"]
+        or search_params["institution_key"]
+        or (search_params["institution_code"] or "").strip()
+        or (search_params["collection_code"] or "").strip()
+    )
+
+
+def search_page_url(search_params: dict, page: int, page_size: int = None) -> str:
+    """
+    Build the occurrence search URL for a page of the current search, using the
+    selected page size unless another is given
+    """
+    if page_size is None:
+        page_size = search_params["page_size"]
+    return generate_gbif_search_url(
+        search_params["fields"],
+        search_params["guids"],
+        institution_key=search_params["institution_key"],
+        institution_code=search_params["institution_code"],
+        collection_code=search_params["collection_code"],
+        offset=page * page_size,
+        limit=page_size,
+    )
+
+
+def change_page(step: int):
+    """Button callback that moves the results pagination by step pages"""
+    st.session_state.current_page += step
+
+
+def export_results(condensed_table: bool):
+    """
+    Fetch every page of the current search and offer them as one CSV download
+    """
+    try:
+        with st.spinner("Fetching all pages..."):
+            results, count = fetch_all_occurrences(st.session_state.search_params)
+    except RequestException as e:
+        st.error(f"Failed to fetch data from GBIF API: {str(e)}")
+        return
+    except (KeyError, ValueError) as e:
+        st.error(f"Received invalid response {str(e)} from GBIF API. Please try again.")
+        return
+
+    if count > EXPORT_MAX_RECORDS:
+        st.caption(
+            f"Only the first {EXPORT_MAX_RECORDS:,} of {count:,} records are included."
+        )
+    st.download_button(
+        "Download all pages as CSV",
+        data=build_dataframe(results, condensed_table).to_csv(index=False),
+        file_name="gbif_results.csv",
+        mime="text/csv",
+        on_click="ignore",
+    )
+
+
 @st.fragment
 def display_results(condensed_table: bool):
     """Fragment that handles data display and pagination independently"""
-    if not (
-        st.session_state.search_params and st.session_state.search_params["fields"]
-    ):
+    if not has_search_filters(st.session_state.search_params):
         return
 
     try:
-        offset = st.session_state.current_page * 300
-        search_url = generate_gbif_search_url(
-            st.session_state.search_params["fields"],
-            institution_key=st.session_state.search_params["institution_key"],
-            institution_code=st.session_state.search_params["institution_code"],
-            collection_code=st.session_state.search_params["collection_code"],
-            offset=offset,
+        page_size = st.session_state.search_params["page_size"]
+        search_url = search_page_url(
+            st.session_state.search_params, st.session_state.current_page
         )
 
         # Use st.status for page loading
@@ -282,54 +752,64 @@ def display_results(condensed_table: bool):
                 status.update(label="No results found", state="error")
 
         if df is not None:
-            if df["recordedBy"].str.contains("|").any():
-                df["recordedBy"] = df["recordedBy"].str.split("|")
-                st.dataframe(
-                    df,
-                    column_config={
-                        "link": st.column_config.LinkColumn(
-                            "link", display_text="View record"
-                        ),
-                        "recordedBy": st.column_config.ListColumn(),
-                        "media_url": st.column_config.LinkColumn(
-                            "image",
-                            display_text="View image",
-                        ),
-                    },
-                    hide_index=True,
-                )
-            else:
-                st.dataframe(
-                    df,
-                    column_config={
-                        "link": st.column_config.LinkColumn(
-                            "link", display_text="View record"
-                        ),
-                        "media_url": st.column_config.LinkColumn(
-                            "image",
-                            display_text="View image",
-                        ),
-                    },
-                    hide_index=True,
-                )
+            # Several collectors are joined with "|"; match it literally, as a
+            # regex "|" matches the empty string and so every row
+            collectors = (
+                df["recordedBy"].str.split("|", regex=False)
+                if "recordedBy" in df.columns
+                else None
+            )
+            has_collector_lists = (
+                collectors is not None and collectors.str.len().gt(1).any()
+            )
+            if has_collector_lists:
+                df["recordedBy"] = collectors
+            st.dataframe(
+                df,
+                column_config=COLLECTORS_COLUMN_CONFIG
+                if has_collector_lists
+                else RESULTS_COLUMN_CONFIG,
+                hide_index=True,
+            )
 
             # Pagination controls
             col1, col2, col3 = st.columns([1, 2, 1])
+            # The page is changed in a callback, before the fragment reruns, so each
+            # click fetches only the new page rather than the current one first
             with col1:
-                if st.button("← Previous", disabled=st.session_state.current_page == 0):
-                    st.session_state.current_page -= 1
-                    st.rerun(scope="fragment")  # Only rerun this fragment
+                st.button(
+                    "← Previous",
+                    disabled=st.session_state.current_page == 0,
+                    on_click=change_page,
+                    args=(-1,),
+                )
 
             with col2:
                 st.write(f"Page {st.session_state.current_page + 1}")
 
             with col3:
-                if st.button("Next →", disabled=len(df) < 300):
-                    st.session_state.current_page += 1
-                    st.rerun(scope="fragment")  # Only rerun this fragment
+                st.button(
+                    "Next →",
+                    disabled=len(df) < page_size,
+                    on_click=change_page,
+                    args=(1,),
+                )
 
             st.markdown(f"[**Open raw GBIF search results**]({search_url})")
 
+            if st.button("Fetch all pages"):
+                export_results(condensed_table)
+
+            # A full page suggests there is another, so fetch it while the user
+            # looks at this one
+            if len(df) == page_size:
+                prefetch_occurrences(
+                    search_page_url(
+                        st.session_state.search_params,
+                        st.session_state.current_page + 1,
+                    )
+                )
+
     except Exception:
         st.error("Sorry something went wrong.")
 
@@ -347,7 +827,7 @@ def main():
     )
     with st.sidebar:
         st.logo(
-            image="data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48ZyBmaWxsPSIjMzE4NjJjIiBmaWxsLXJ1bGU9ImV2ZW5vZGQiIGNsaXAtcnVsZT0iZXZlbm9kZCI+PHBhdGggZD0iTTIyLjU4NiAxMC4xNzNhMi4yNSAyLjI1IDAgMCAxLTIuMTc3LS41ODJsLS41NDEtLjU0MWE0Ljc1IDQuNzUgMCAwIDEtNS4xOS03LjM3MWE3LjcgNy43IDAgMCAwLTEuNjA0LS4zNzZBMTEgMTEgMCAwIDAgMTIgMS4yNUM2LjA2MyAxLjI1IDEuMjUgNi4wNjMgMS4yNSAxMmMwIDEuODU2LjQ3MSAzLjYwNSAxLjMgNS4xM2wtLjc4NyA0LjIzM2EuNzUuNzUgMCAwIDAgLjg3NC44NzRsNC4yMzMtLjc4OEExMC43IDEwLjcgMCAwIDAgMTIgMjIuNzVjNS45MzcgMCAxMC43NS00LjgxMyAxMC43NS0xMC43NXEwLS41NDMtLjA1My0xLjA3NHMtLjA0NS0uMzI1LS4xMTEtLjc1M00xOS45NyA1Ljk3YS43NS43NSAwIDAgMSAxLjA2IDBsMS41IDEuNWEuNzUuNzUgMCAwIDEtMS4wNiAxLjA2bC0xLjUtMS41YS43NS43NSAwIDAgMSAwLTEuMDYiLz48cGF0aCBkPSJNMTguNSAyLjc1YTEuNzUgMS43NSAwIDEgMCAwIDMuNWExLjc1IDEuNzUgMCAwIDAgMC0zLjVNMTUuMjUgNC41YTMuMjUgMy4yNSAwIDEgMSA2LjUgMGEzLjI1IDMuMjUgMCAwIDEtNi41IDAiLz48L2c+PC9zdmc+",
+            image=PAGE_ICON,
             size="large",
         )
         st.markdown("# GBIF Natural Language Search")
@@ -363,8 +843,8 @@ def main():
                     - Records collected by a particular person.
                         """)
         with st.expander(label="Privacy and disclaimers", expanded=False):
-            st.markdown("""
-                    Queries are parsed by ChatGPT o4-mini. Any text entered in the search box will be sent to OpenAI and be visible to the developers. You may review the privacy policy of OpenAI [here](https://openai.com/policies/row-privacy-policy/). This project is not endorsed or affiliated with GBIF. This tool comes with no uptime warranties or guarantees.
+            st.markdown(f"""
+                    Queries are parsed by OpenAI's {QUERY_MODEL} model. Any text entered in the search box will be sent to OpenAI and be visible to the developers. You may review the privacy policy of OpenAI [here](https://openai.com/policies/row-privacy-policy/). This project is not endorsed or affiliated with GBIF. This tool comes with no uptime warranties or guarantees.
                         """)
         with st.expander(label="Source code", expanded=False):
             st.markdown("""
@@ -373,29 +853,39 @@ def main():
                         """)
 
     st.markdown("## Search")
-    user_query = st.text_input(
-        "Enter your specimen search query",
-        placeholder="e.g. Blue Jays from Toronto",
-    )
-    with st.expander("Manual configuration options"):
-        # Attempt to get the institution key from the environment if set
-        institution_key = os.getenv("INSTITUTION_KEY")
-        # If not configured, give the user the opportunity to narrow down their searches.
-        if not institution_key:
-            st.markdown(
-                "If you would like to filter your results to a particular institution or collection, enter those values below. The search will attempt to parse these values from your query, however can be unreliable."
-            )
-            col1, col2 = st.columns(2)
-            with col1:
-                institution_code = st.text_input(
-                    "Institution Code",
-                    placeholder="e.g. BBM",
-                )
-            with col2:
-                collection_code = st.text_input(
-                    "Collection Code",
-                    placeholder="e.g. CTC",
+    # Inputs only take effect on submit, so typing and adjusting options does
+    # not rerun the script for every widget change
+    with st.form("search_form", border=False):
+        user_query = st.text_input(
+            "Enter your specimen search query",
+            placeholder="e.g. Blue Jays from Toronto",
+        )
+        with st.expander("Manual configuration options"):
+            # Attempt to get the institution key from the environment if set
+            institution_key = os.getenv("INSTITUTION_KEY")
+            # If not configured, give the user the opportunity to narrow down their searches.
+            if not institution_key:
+                st.markdown(
+                    "If you would like to filter your results to a particular institution or collection, enter those values below. The search will attempt to parse these values from your query, however can be unreliable."
                 )
+                col1, col2 = st.columns(2)
+                with col1:
+                    institution_code = st.text_input(
+                        "Institution Code",
+                        placeholder="e.g. BBM",
+                    )
+                with col2:
+                    collection_code = st.text_input(
+                        "Collection Code",
+                        placeholder="e.g. CTC",
+                    )
+            # Smaller pages download, parse and render faster
+            page_size = st.select_slider(
+                "Results per page",
+                options=PAGE_SIZE_OPTIONS,
+                value=PAGE_SIZE,
+            )
+        search_clicked = st.form_submit_button("SEARCH")
 
     if "current_page" not in st.session_state:
         st.session_state.current_page = 0
@@ -406,13 +896,13 @@ def main():
         label="Condensed results table",
         value=True,
     )
-    search_clicked = st.button("SEARCH")
 
     if search_clicked and user_query:
         # Reset to first page on new search
         st.session_state.current_page = 0
         st.session_state.search_params = {
             "fields": None,
+            "guids": {},
             "institution_key": institution_key,
             "institution_code": institution_code
             if "institution_code" in locals()
@@ -420,16 +910,35 @@ def main():
             "collection_code": collection_code
             if "collection_code" in locals()
             else None,
+            "page_size": page_size,
         }
 
+        warm_up_gbif_connection()
         with st.spinner("Processing query..."):
             try:
                 fields = extract_query_fields(user_query)
                 st.session_state.search_params["fields"] = fields
-                st.subheader("Interpreted parameters")
-                st.table(fields)
+                # Resolve names to keys once here, so every page of the search
+                # filters on the same keys without repeating the lookups
+                st.session_state.search_params["guids"] = resolve_guids(fields)
+                if fields:
+                    st.subheader("Interpreted parameters")
+                    st.table(fields)
             except Exception:
                 st.error("Sorry something went wrong. Please try again.")
+            finally:
+                # Lookups prefetched for names the final fields didn't use, or
+                # left over from a parse that failed, are dropped with the search
+                discard_pending_lookups()
+
+        # Stop before fetching anything if the query parsed but gave no filters
+        if st.session_state.search_params["fields"] == {} and not has_search_filters(
+            st.session_state.search_params
+        ):
+            st.warning(
+                "Your query couldn't be parsed into any search filters. Please try rephrasing it."
+            )
+            st.stop()
 
     display_results(condensed_table=condensed_table)
 
@@ -0,0 +1,4 @@
+"""
+Constants used by app.py. They live in an imported package so they are built
+once per process rather than on every Streamlit rerun of the script.
+"""
@@ -0,0 +1,4 @@
+"""Static assets for the app"""
+
+# Logo from iconoir, used as both the page icon and the sidebar logo
+PAGE_ICON = "data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0Ij48ZyBmaWxsPSIjMzE4NjJjIiBmaWxsLXJ1bGU9ImV2ZW5vZGQiIGNsaXAtcnVsZT0iZXZlbm9kZCI+PHBhdGggZD0iTTIyLjU4NiAxMC4xNzNhMi4yNSAyLjI1IDAgMCAxLTIuMTc3LS41ODJsLS41NDEtLjU0MWE0Ljc1IDQuNzUgMCAwIDEtNS4xOS03LjM3MWE3LjcgNy43IDAgMCAwLTEuNjA0LS4zNzZBMTEgMTEgMCAwIDAgMTIgMS4yNUM2LjA2MyAxLjI1IDEuMjUgNi4wNjMgMS4yNSAxMmMwIDEuODU2LjQ3MSAzLjYwNSAxLjMgNS4xM2wtLjc4NyA0LjIzM2EuNzUuNzUgMCAwIDAgLjg3NC44NzRsNC4yMzMtLjc4OEExMC43IDEwLjcgMCAwIDAgMTIgMjIuNzVjNS45MzcgMCAxMC43NS00LjgxMyAxMC43NS0xMC43NXEwLS41NDMtLjA1My0xLjA3NHMtLjA0NS0uMzI1LS4xMTEtLjc1M00xOS45NyA1Ljk3YS43NS43NSAwIDAgMSAxLjA2IDBsMS41IDEuNWEuNzUuNzUgMCAwIDEtMS4wNiAxLjA2bC0xLjUtMS41YS43NS43NSAwIDAgMSAwLTEuMDYiLz48cGF0aCBkPSJNMTguNSAyLjc1YTEuNzUgMS43NSAwIDEgMCAwIDMuNWExLjc1IDEuNzUgMCAwIDAgMC0zLjVNMTUuMjUgNC41YTMuMjUgMy4yNSAwIDEgMSA2LjUgMGEzLjI1IDMuMjUgMCAwIDEtNi41IDAiLz48L2c+PC9zdmc+"